@@ -1,4 +1,4 @@
-from .buffer import ImageShape, RingBuffer
+from .buffer import METADATA_DTYPE, ImageShape, RingBuffer, clear_buffer_pool
 from .core.pixel_format import PixelFormat
 
-__all__ = ["ImageShape", "PixelFormat", "RingBuffer"]
+__all__ = ["METADATA_DTYPE", "ImageShape", "PixelFormat", "RingBuffer", "clear_buffer_pool"]
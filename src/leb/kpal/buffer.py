@@ -1,54 +1,333 @@
+import sys
+import threading
 from collections.abc import Buffer
 from dataclasses import dataclass, field
-from functools import cached_property
+
+import numpy as np
+import numpy.typing as npt
 
 from .core.pixel_format import PixelFormat
 
 type ImageShape = tuple[int, int]
 
+_ALIGNMENT = 64
+"""Alignment in bytes of the start of each RingBuffer's memory."""
+
+METADATA_DTYPE = np.dtype([("ts", "<u8"), ("frame_id", "<u8"), ("flags", "<u4")])
+"""Per-image metadata stored alongside the image data in a RingBuffer."""
+
+
+def _aligned_zeros(num_bytes: int) -> npt.NDArray[np.uint8]:
+    """Allocates a zeroed byte array whose first element is aligned to _ALIGNMENT."""
+    raw = np.zeros(num_bytes + _ALIGNMENT, dtype=np.uint8)
+    offset = -raw.ctypes.data % _ALIGNMENT
+
+    return raw[offset : offset + num_bytes]
+
+
+def _as_bytes(data: Buffer) -> memoryview:
+    """Returns a flat, unsigned byte view of data without copying it.
+
+    Copying between two such views is a plain memcpy, while copying between views of different
+    formats or shapes goes through a slower element-wise path.
+    """
+    view = memoryview(data)
+    if view.ndim == 1 and view.format == "B":
+        return view
+
+    try:
+        return view.cast("B")
+    except TypeError:
+        # memoryview only casts native formats; NumPy handles the rest, such as big-endian data,
+        # and raises ValueError if data is not contiguous.
+        return memoryview(np.frombuffer(data, dtype=np.uint8))
+
+
+def _check_metadata(name: str, values: npt.ArrayLike) -> npt.ArrayLike:
+    """Returns values if they fit in the given metadata field, raising otherwise.
+
+    NumPy wraps out-of-range values when assigning arrays to fields, while put raises for them
+    because it converts each value as a Python int. This applies the same rules to arrays.
+    """
+    arr = np.asarray(values)
+    if arr.size == 0 or arr.dtype.kind not in "iuf":
+        return values
+
+    if arr.dtype.kind == "f" and not np.isfinite(arr).all():
+        raise ValueError(f"{name} values must be finite")
+
+    max_value = np.iinfo(METADATA_DTYPE[name]).max
+    if arr.min() <= -1 or arr.max() >= max_value + 1:
+        raise OverflowError(f"{name} values must be between 0 and {max_value}")
+
+    return arr
+
+
+_POOL_MAX_BLOCKS = 4
+"""Maximum number of freed blocks of memory that are kept for reuse."""
+
+_POOL_MAX_BYTES = 1 << 30
+"""Maximum total size in bytes of the freed blocks that are kept for reuse."""
+
+_pool: dict[int, list[npt.NDArray[np.uint8]]] = {}
+_pool_size = 0
+_pool_bytes = 0
+_pool_lock = threading.Lock()
+
+
+def _acquire(num_bytes: int) -> npt.NDArray[np.uint8]:
+    """Returns a zeroed block of num_bytes bytes from the pool, or allocates a new one."""
+    global _pool_size, _pool_bytes
+
+    block: npt.NDArray[np.uint8] | None = None
+    with _pool_lock:
+        blocks = _pool.get(num_bytes)
+        if blocks:
+            _pool_size -= 1
+            _pool_bytes -= num_bytes
+            block = blocks.pop()
+            if not blocks:
+                del _pool[num_bytes]
+
+    if block is None:
+        return _aligned_zeros(num_bytes)
+
+    # Don't let a new RingBuffer show the frames of the one that freed the block
+    block.fill(0)
+
+    return block
+
+
+def _release(block: npt.NDArray[np.uint8]) -> None:
+    """Returns a block to the pool, evicting the least recently freed sizes when it is full."""
+    global _pool_size, _pool_bytes
+
+    if block.size > _POOL_MAX_BYTES:
+        return
+
+    with _pool_lock:
+        # Reinsert the size so that dict order runs from least to most recently freed
+        blocks = _pool.pop(block.size, [])
+        blocks.append(block)
+        _pool[block.size] = blocks
+        _pool_size += 1
+        _pool_bytes += block.size
+
+        while _pool_size > _POOL_MAX_BLOCKS or _pool_bytes > _POOL_MAX_BYTES:
+            oldest = next(iter(_pool))
+            _pool[oldest].pop(0)
+            _pool_size -= 1
+            _pool_bytes -= oldest
+            if not _pool[oldest]:
+                del _pool[oldest]
+
+
+def clear_buffer_pool() -> None:
+    """Frees the memory of closed RingBuffers that is being kept for reuse."""
+    global _pool_size, _pool_bytes
+
+    with _pool_lock:
+        _pool.clear()
+        _pool_size = 0
+        _pool_bytes = 0
+
 
 @dataclass
 class RingBuffer:
-    """A circular buffer of contiguous memory for storing raw image data."""
+    """A circular buffer of contiguous memory for storing raw image data.
+
+    Each image has a metadata record (see METADATA_DTYPE) that is kept in a separate array, so
+    that consumers that only need metadata do not have to touch the image data.
+
+    Each image must occupy a whole number of bytes, so that the slots tile the buffer exactly.
+    When the capacity is a power of two, the write position wraps with a bitmask. Other
+    capacities fall back to a compare and subtract.
+    """
 
     capacity: int
     shape: ImageShape
     pixel_format: PixelFormat
 
     buf: memoryview = field(init=False, repr=False)
+    item_size: int = field(init=False, repr=False)
+    """The size of a single image in bytes."""
+    num_bytes: int = field(init=False, repr=False)
+    """The total number of bytes in the buffer."""
 
-    _cursor: int = field(init=False, repr=False, default=0)
+    _backing: npt.NDArray[np.uint8] | None = field(init=False, repr=False, compare=False)
+    _meta: npt.NDArray[np.void] = field(init=False, repr=False, compare=False)
+    _record: npt.NDArray[np.void] = field(init=False, repr=False, compare=False)
+    _slot: int = field(init=False, repr=False, default=0)
+    _slot_mask: int = field(init=False, repr=False, default=0)
+    _pow2: bool = field(init=False, repr=False, default=False)
 
     def __post_init__(self) -> None:
-        num_bits = (
-            self.capacity * self.shape[0] * self.shape[1] * self.pixel_format.bits_per_pixel()
-        )
-        num_bytes, remainder = divmod(num_bits, 8)
+        num_bits = self.shape[0] * self.shape[1] * self.pixel_format.bits_per_pixel()
+        item_size, remainder = divmod(num_bits, 8)
 
         if remainder != 0:
             raise ValueError(
-                f"Buffer with requested shape {self.shape} and format {self.pixel_format} would not hold an integer number of bytes"
+                f"Images with requested shape {self.shape} and format {self.pixel_format} would not hold an integer number of bytes"
             )
 
-        self.buf = memoryview(bytearray(num_bytes))
+        self.item_size = item_size
+        self.num_bytes = self.capacity * item_size
+        self._backing = _acquire(self.num_bytes)
+        self.buf = memoryview(self._backing)
+        self._meta = np.zeros(self.capacity, dtype=METADATA_DTYPE)
+        self._record = np.zeros((), dtype=METADATA_DTYPE)
+
+        self._pow2 = self.capacity & (self.capacity - 1) == 0
+        self._slot_mask = self.capacity - 1
+
+    def __getitem__(self, index: int) -> memoryview:
+        """Returns a read-only view of the image in the slot at the given index.
+
+        Only the RingBuffer writes into its slots, through put or reserve, so the views handed out
+        to consumers cannot be written to.
+        """
+        if not -self.capacity <= index < self.capacity:
+            raise IndexError(f"Slot index {index} is out of range for capacity {self.capacity}")
+
+        loc = (index % self.capacity) * self.item_size
+
+        return self.buf[loc : (loc + self.item_size)].toreadonly()
 
     @property
     def cursor(self) -> int:
-        return self._cursor
+        """Returns the index of the slot that the next image will be written to."""
+        return self._slot
+
+    def close(self) -> None:
+        """Returns the buffer's memory to a pool so that new RingBuffers of the same size reuse it.
+
+        Writing to the RingBuffer after it is closed raises ValueError. If views obtained from it
+        with reserve or indexing are still alive, the memory stays with them and is not pooled.
+        """
+        with _pool_lock:
+            backing = self._backing
+            if backing is None:
+                return
+            self._backing = None
+
+        try:
+            self.buf.release()
+        except BufferError:
+            # Something still holds an export of buf and keeps the memory alive
+            return
+
+        # Views of buf keep a reference to the block even after buf is released. Only pool the
+        # block when the local name and getrefcount's argument are its only references.
+        if sys.getrefcount(backing) == 2:
+            _release(backing)
+
+    def meta_view(self) -> npt.NDArray[np.void]:
+        """Returns a read-only view of the metadata records of all slots."""
+        view = self._meta.view()
+        view.flags.writeable = False
+
+        return view
+
+    def put(self, data: Buffer, ts: int = 0, frame_id: int = 0, flags: int = 0) -> None:
+        """Copies data and its metadata into the RingBuffer.
+
+        data is read as raw bytes without being copied or reshaped first, so it must be
+        C-contiguous. Raw sensor data always is; producers passing other arrays are responsible
+        for making them contiguous.
+
+        One-dimensional byte buffers such as bytes, bytearray or a uint8 memoryview are copied
+        as they are. Anything else, e.g. a 2D uint16 array, is first cast to a flat byte view.
+        """
+        self._check_open()
+        item_size = self.item_size
+
+        src = _as_bytes(data)
+        if src.nbytes != item_size:
+            raise ValueError(f"Expected an image of {item_size} bytes, got {src.nbytes} bytes")
+        record = self._to_record(ts, frame_id, flags)
+
+        slot = self._slot
+        loc = slot * item_size
+        self.buf[loc : (loc + item_size)] = src
+        self._meta[slot] = record
+        self._advance()
+
+    def put_many(
+        self,
+        data: Buffer,
+        ts: npt.ArrayLike = 0,
+        frame_id: npt.ArrayLike = 0,
+        flags: npt.ArrayLike = 0,
+    ) -> None:
+        """Copies a batch of consecutive images and their metadata into the RingBuffer.
+
+        data holds the images back to back, e.g. as an array of shape (N, *shape), and must be
+        C-contiguous. The metadata arguments are broadcast to one value per image. The whole batch
+        is written with at most two copies, however many images it contains.
+        """
+        self._check_open()
+        src = _as_bytes(data)
+        num_images, remainder = divmod(src.nbytes, self.item_size)
+        if remainder != 0:
+            raise ValueError(
+                f"Expected a whole number of images of {self.item_size} bytes, got {src.nbytes} bytes"
+            )
+        if num_images > self.capacity:
+            raise ValueError(
+                f"Cannot put {num_images} images into a buffer with capacity {self.capacity}"
+            )
+
+        records = np.empty(num_images, dtype=METADATA_DTYPE)
+        for name, values in (("ts", ts), ("frame_id", frame_id), ("flags", flags)):
+            records[name] = _check_metadata(name, values)
+
+        # A batch fits in the buffer, so it wraps around the end at most once.
+        slot = self._slot
+        slot_end = slot + num_images
+        loc = slot * self.item_size
+        if slot_end <= self.capacity:
+            self.buf[loc : (loc + src.nbytes)] = src
+            self._meta[slot:slot_end] = records
+        else:
+            first = self.capacity - slot
+            split = first * self.item_size
+            self.buf[loc:] = src[:split]
+            self.buf[: (src.nbytes - split)] = src[split:]
+            self._meta[slot:] = records[:first]
+            self._meta[: (slot_end - self.capacity)] = records[first:]
+        self._slot = slot_end - self.capacity if slot_end >= self.capacity else slot_end
+
+    def reserve(self) -> memoryview:
+        """Returns a writable view of the slot that the next image will be written to.
+
+        This allows producers to write an image directly into the buffer instead of copying it in
+        with put. Call commit once the image has been written.
+        """
+        self._check_open()
+        loc = self._slot * self.item_size
+
+        return self.buf[loc : (loc + self.item_size)]
+
+    def commit(self, ts: int = 0, frame_id: int = 0, flags: int = 0) -> None:
+        """Marks the slot returned by reserve as written and moves the cursor to the next one."""
+        self._check_open()
+        self._meta[self._slot] = self._to_record(ts, frame_id, flags)
+        self._advance()
 
-    @cached_property
-    def item_size(self) -> int:
-        """Returns the size of a single image in bytes."""
-        return self.shape[0] * self.shape[1] * self.pixel_format.bits_per_pixel() // 8
+    def _check_open(self) -> None:
+        if self._backing is None:
+            raise ValueError("Cannot write to a closed RingBuffer")
 
-    @cached_property
-    def num_bytes(self) -> int:
-        """Returns the total number of bytes in the buffer."""
-        return self.buf.nbytes
+    def _to_record(self, ts: int, frame_id: int, flags: int) -> npt.NDArray[np.void]:
+        """Converts metadata to a record, raising before anything is written if it is invalid."""
+        self._record[()] = (ts, frame_id, flags)
 
-    def put(self, data: Buffer) -> None:
-        """Copies data into the RingBuffer."""
-        # TODO: Test this!
-        loc = (self.cursor * self.item_size) % self.num_bytes
+        return self._record
 
-        self.buf[loc : (loc + self.item_size)] = data
+    def _advance(self) -> None:
+        # The cursor advances by exactly one slot, so wrapping needs a subtraction, not a modulo.
+        slot = self._slot + 1
+        if self._pow2:
+            self._slot = slot & self._slot_mask
+        else:
+            self._slot = 0 if slot == self.capacity else slot
@@ -1,14 +1,70 @@
+from collections.abc import Buffer
 from enum import StrEnum, auto
 
+import numpy as np
+import numpy.typing as npt
+
 
 class PixelFormat(StrEnum):
     MONO12P = auto()
     MONO16 = auto()
 
     def bits_per_pixel(self) -> int:
+        try:
+            return _BITS_PER_PIXEL[self]
+        except KeyError:
+            raise ValueError(f"Unsupported pixel format: {self}") from None
+
+    def unpack(
+        self, buf: Buffer, out: npt.NDArray[np.uint16] | None = None
+    ) -> npt.NDArray[np.uint16]:
+        """Unpacks raw image data in this format into one uint16 per pixel.
+
+        MONO12P data follows the GenICam Mono12p layout: every three bytes hold two pixels, least
+        significant bits first. If given, out must be C-contiguous and hold exactly as many pixels
+        as buf. Returns out, or a new 1D array if out is None.
+        """
+        src = np.frombuffer(buf, dtype=np.uint8)
+
         if self == PixelFormat.MONO12P:
-            return 12
-        if self == PixelFormat.MONO16:
-            return 16
+            num_groups, remainder = divmod(src.size, 3)
+            if remainder != 0:
+                raise ValueError(f"MONO12P data must be a multiple of 3 bytes, got {src.size}")
+            num_pixels = 2 * num_groups
+        elif self == PixelFormat.MONO16:
+            num_pixels, remainder = divmod(src.size, 2)
+            if remainder != 0:
+                raise ValueError(f"MONO16 data must be a multiple of 2 bytes, got {src.size}")
         else:
-            raise ValueError(f"Unsupported pixel format: {self}")
+            raise ValueError(f"Unpacking is not supported for pixel format: {self}")
+
+        if out is None:
+            out = np.empty(num_pixels, dtype=np.uint16)
+        elif out.dtype != np.uint16 or out.size != num_pixels or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous uint16 array of {num_pixels} pixels")
+
+        if self == PixelFormat.MONO12P:
+            groups = src.reshape(-1, 3)
+            pixels = out.reshape(-1, 2)
+
+            # Even pixels are byte 0 plus the low nibble of byte 1 as the high bits
+            even = pixels[:, 0]
+            np.bitwise_and(groups[:, 1], 0x0F, out=even)
+            even <<= 8
+            even |= groups[:, 0]
+
+            # Odd pixels are the high nibble of byte 1 plus byte 2 as the high bits
+            odd = pixels[:, 1]
+            odd[...] = groups[:, 2]
+            odd <<= 4
+            odd |= groups[:, 1] >> 4
+        elif self == PixelFormat.MONO16:
+            out.reshape(-1)[...] = src.view("<u2")
+
+        return out
+
+
+_BITS_PER_PIXEL: dict[PixelFormat, int] = {
+    PixelFormat.MONO12P: 12,
+    PixelFormat.MONO16: 16,
+}
@@ -1,6 +1,10 @@
+import threading
+
+import numpy as np
+import numpy.typing as npt
 import pytest
 
-from leb.kpal import PixelFormat, RingBuffer
+from leb.kpal import METADATA_DTYPE, PixelFormat, RingBuffer, buffer, clear_buffer_pool
 
 
 def test_ring_buffer_correct_shape() -> None:
@@ -20,3 +24,274 @@ def test_ring_buffer_size() -> None:
     expected_size_bytes = (10 * 8 * 8 * 12) // 8
 
     assert expected_size_bytes == ring_buffer.buf.nbytes
+
+
+def test_ring_buffer_put() -> None:
+    ring_buffer = RingBuffer(3, (2, 2), PixelFormat.MONO16)
+
+    for i in range(4):
+        ring_buffer.put(bytes([i + 1]) * ring_buffer.item_size)
+
+    assert ring_buffer.cursor == 1
+    assert ring_buffer.buf[:8] == bytes([4]) * 8
+    assert ring_buffer.buf[8:16] == bytes([2]) * 8
+    assert ring_buffer.buf[16:] == bytes([3]) * 8
+
+
+def test_ring_buffer_put_power_of_two() -> None:
+    ring_buffer = RingBuffer(4, (2, 2), PixelFormat.MONO16)
+
+    for i in range(5):
+        ring_buffer.put(bytes([i + 1]) * ring_buffer.item_size)
+
+    assert ring_buffer.cursor == 1
+    assert ring_buffer.buf[:8] == bytes([5]) * 8
+    assert ring_buffer.buf[24:] == bytes([4]) * 8
+
+
+def test_ring_buffer_is_aligned() -> None:
+    ring_buffer = RingBuffer(3, (5, 5), PixelFormat.MONO16)
+
+    assert np.frombuffer(ring_buffer.buf, dtype=np.uint8).ctypes.data % 64 == 0
+
+
+def test_ring_buffer_incomplete_byte_images() -> None:
+    # 2 images of 4.5 bytes would fill 9 bytes, but the slots would not tile the buffer
+    with pytest.raises(ValueError):
+        RingBuffer(2, (1, 3), PixelFormat.MONO12P)
+
+
+def test_ring_buffer_reserve_commit() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+
+    for i in range(3):
+        slot = ring_buffer.reserve()
+        slot[:] = bytes([i + 1]) * ring_buffer.item_size
+        ring_buffer.commit()
+
+    assert ring_buffer.cursor == 1
+    assert ring_buffer.buf.tobytes() == bytes([3]) * 8 + bytes([2]) * 8
+
+
+def test_ring_buffer_put_wrong_size() -> None:
+    ring_buffer = RingBuffer(2, (1, 2), PixelFormat.MONO16)
+    ring_buffer.put(bytes([1]) * ring_buffer.item_size)
+    ring_buffer.put(bytes([2]) * ring_buffer.item_size)
+
+    with pytest.raises(ValueError):
+        ring_buffer.put(bytes([3]) * (ring_buffer.item_size + 1))
+
+    assert ring_buffer.buf.tobytes() == bytes([1, 1, 1, 1, 2, 2, 2, 2])
+    assert ring_buffer.cursor == 0
+
+
+def test_ring_buffer_metadata() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+
+    ring_buffer.put(bytes(ring_buffer.item_size), ts=100, frame_id=1)
+    ring_buffer.reserve()
+    ring_buffer.commit(ts=200, frame_id=2, flags=1)
+    ring_buffer.put(bytes(ring_buffer.item_size), ts=300, frame_id=3)
+
+    meta = ring_buffer.meta_view()
+    assert meta.dtype == METADATA_DTYPE
+    np.testing.assert_array_equal(meta["ts"], [300, 200])
+    np.testing.assert_array_equal(meta["frame_id"], [3, 2])
+    np.testing.assert_array_equal(meta["flags"], [0, 1])
+    assert not meta.flags.writeable
+
+
+def test_ring_buffer_close_reuses_memory() -> None:
+    ring_buffer = RingBuffer(3, (4, 4), PixelFormat.MONO16)
+    address = np.frombuffer(ring_buffer.buf, dtype=np.uint8).ctypes.data
+    ring_buffer.put(bytes([1]) * ring_buffer.item_size)
+    ring_buffer.close()
+    ring_buffer.close()
+
+    reused = RingBuffer(3, (4, 4), PixelFormat.MONO16)
+    other = RingBuffer(3, (4, 4), PixelFormat.MONO16)
+
+    assert np.frombuffer(reused.buf, dtype=np.uint8).ctypes.data == address
+    assert np.frombuffer(other.buf, dtype=np.uint8).ctypes.data != address
+    assert reused[0] == bytes(reused.item_size)
+
+
+def test_ring_buffer_getitem() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+    ring_buffer.put(bytes([1]) * ring_buffer.item_size)
+    ring_buffer.put(bytes([2]) * ring_buffer.item_size)
+
+    assert ring_buffer[0] == bytes([1]) * 8
+    assert ring_buffer[-1] == bytes([2]) * 8
+    assert ring_buffer[1].readonly
+
+    with pytest.raises(IndexError):
+        ring_buffer[2]
+
+
+def test_ring_buffer_put_non_contiguous() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+    image = np.zeros((2, 4), dtype=np.uint16)[:, :2]
+
+    with pytest.raises(ValueError):
+        ring_buffer.put(image)
+
+
+def test_ring_buffer_put_many() -> None:
+    ring_buffer = RingBuffer(3, (2, 2), PixelFormat.MONO16)
+    ring_buffer.put(np.full((2, 2), 1, dtype=np.uint16), frame_id=1)
+
+    batch = np.stack([np.full((2, 2), i, dtype=np.uint16) for i in (2, 3, 4)])
+    ring_buffer.put_many(batch, ts=[20, 30, 40], frame_id=[2, 3, 4])
+
+    assert ring_buffer.cursor == 1
+    assert ring_buffer[0] == np.full((2, 2), 4, dtype=np.uint16).tobytes()
+    assert ring_buffer[1] == np.full((2, 2), 2, dtype=np.uint16).tobytes()
+    assert ring_buffer[2] == np.full((2, 2), 3, dtype=np.uint16).tobytes()
+    np.testing.assert_array_equal(ring_buffer.meta_view()["frame_id"], [4, 2, 3])
+    np.testing.assert_array_equal(ring_buffer.meta_view()["ts"], [40, 20, 30])
+
+    ring_buffer.put(np.full((2, 2), 5, dtype=np.uint16), frame_id=5)
+    assert ring_buffer[1] == np.full((2, 2), 5, dtype=np.uint16).tobytes()
+
+
+def test_ring_buffer_put_many_too_many_images() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+
+    with pytest.raises(ValueError):
+        ring_buffer.put_many(np.zeros((3, 2, 2), dtype=np.uint16))
+
+
+def test_ring_buffer_put_non_native_byte_order() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+    image = np.arange(4, dtype=">u2").reshape(2, 2)
+
+    ring_buffer.put(image)
+
+    assert ring_buffer[0] == image.tobytes()
+
+
+def test_ring_buffer_equality_unwritten() -> None:
+    assert RingBuffer(1, (64, 64), PixelFormat.MONO16) == RingBuffer(1, (64, 64), PixelFormat.MONO16)
+
+
+def test_ring_buffer_equality() -> None:
+    ring_buffer = RingBuffer(1, (2, 2), PixelFormat.MONO16)
+    other = RingBuffer(1, (2, 2), PixelFormat.MONO16)
+    ring_buffer.put(bytes(ring_buffer.item_size))
+    other.put(bytes(other.item_size))
+
+    assert ring_buffer == other
+
+    other.put(bytes([1]) * other.item_size)
+
+    assert ring_buffer != other
+
+
+def test_ring_buffer_put_invalid_metadata() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+    ring_buffer.put(bytes([1]) * ring_buffer.item_size, frame_id=1)
+    ring_buffer.put(bytes([2]) * ring_buffer.item_size, frame_id=2)
+
+    with pytest.raises(OverflowError):
+        ring_buffer.put(bytes([3]) * ring_buffer.item_size, ts=-1)
+
+    assert ring_buffer.cursor == 0
+    assert ring_buffer[0] == bytes([1]) * ring_buffer.item_size
+    np.testing.assert_array_equal(ring_buffer.meta_view()["frame_id"], [1, 2])
+
+    ring_buffer.put(bytes([3]) * ring_buffer.item_size, frame_id=3)
+
+    assert ring_buffer.cursor == 1
+    np.testing.assert_array_equal(ring_buffer.meta_view()["frame_id"], [3, 2])
+
+
+
+
+def test_ring_buffer_put_many_after_close() -> None:
+    ring_buffer = RingBuffer(2, (3, 3), PixelFormat.MONO16)
+    ring_buffer.close()
+    reused = RingBuffer(2, (3, 3), PixelFormat.MONO16)
+    reused.put(bytes([1]) * reused.item_size)
+
+    with pytest.raises(ValueError):
+        ring_buffer.put_many(np.zeros((1, 3, 3), dtype=np.uint16))
+
+    assert reused[0] == bytes([1]) * reused.item_size
+
+
+def test_ring_buffer_write_after_close() -> None:
+    ring_buffer = RingBuffer(2, (2, 2), PixelFormat.MONO16)
+    ring_buffer.close()
+
+    with pytest.raises(ValueError):
+        ring_buffer.put(bytes(ring_buffer.item_size))
+    with pytest.raises(ValueError):
+        ring_buffer.put_many(bytes(ring_buffer.item_size))
+    with pytest.raises(ValueError):
+        ring_buffer.reserve()
+    with pytest.raises(ValueError):
+        ring_buffer.commit()
+
+
+def test_buffer_pool_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    clear_buffer_pool()
+    monkeypatch.setattr(buffer, "_POOL_MAX_BYTES", 48)
+
+    RingBuffer(2, (4, 4), PixelFormat.MONO16).close()
+    assert buffer._pool_bytes == 0
+
+    ring_buffers = [RingBuffer(1, (4, 4), PixelFormat.MONO16) for _ in range(3)]
+    for ring_buffer in ring_buffers:
+        ring_buffer.close()
+    assert buffer._pool_bytes == 32
+
+    clear_buffer_pool()
+    assert buffer._pool_bytes == 0
+    assert not buffer._pool
+
+
+def test_ring_buffer_close_with_live_view() -> None:
+    clear_buffer_pool()
+    ring_buffer = RingBuffer(2, (5, 5), PixelFormat.MONO16)
+    slot = ring_buffer.reserve()
+    ring_buffer.close()
+
+    reused = RingBuffer(2, (5, 5), PixelFormat.MONO16)
+
+    address = np.frombuffer(slot, dtype=np.uint8).ctypes.data
+    assert np.frombuffer(reused.buf, dtype=np.uint8).ctypes.data != address
+
+
+def test_ring_buffer_concurrent_close() -> None:
+    clear_buffer_pool()
+    ring_buffer = RingBuffer(2, (6, 6), PixelFormat.MONO16)
+
+    threads = [threading.Thread(target=ring_buffer.close) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert buffer._pool_size == 1
+
+
+@pytest.mark.parametrize(
+    "metadata",
+    [
+        {"ts": np.array([-1, 0])},
+        {"frame_id": np.array([0, -5], dtype=np.int64)},
+        {"flags": np.array([2**32, 0], dtype=np.uint64)},
+        {"ts": [0, -1]},
+    ],
+)
+def test_ring_buffer_put_many_invalid_metadata(metadata: dict[str, npt.ArrayLike]) -> None:
+    ring_buffer = RingBuffer(3, (2, 2), PixelFormat.MONO16)
+    ring_buffer.put(bytes([1]) * ring_buffer.item_size, frame_id=1)
+
+    with pytest.raises(OverflowError):
+        ring_buffer.put_many(bytes([2]) * (2 * ring_buffer.item_size), **metadata)
+
+    assert ring_buffer.cursor == 1
+    assert ring_buffer[1] == bytes(ring_buffer.item_size)
+    np.testing.assert_array_equal(ring_buffer.meta_view()["frame_id"], [1, 0, 0])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from leb.kpal import PixelFormat
+
+
+@pytest.mark.parametrize(
+    "pixel_format,expected", [(PixelFormat.MONO12P, 12), (PixelFormat.MONO16, 16)]
+)
+def test_bits_per_pixel(pixel_format: PixelFormat, expected: int) -> None:
+    assert pixel_format.bits_per_pixel() == expected
+
+
+def test_unpack_mono12p() -> None:
+    pixels = np.array([0x123, 0xABC, 0xFFF, 0x001], dtype=np.uint16)
+    packed = bytes([0x23, 0xC1, 0xAB, 0xFF, 0x1F, 0x00])
+
+    np.testing.assert_array_equal(PixelFormat.MONO12P.unpack(packed), pixels)
+
+
+def test_unpack_mono12p_into_out() -> None:
+    out = np.zeros((2, 2), dtype=np.uint16)
+    packed = bytes([0x23, 0xC1, 0xAB, 0xFF, 0x1F, 0x00])
+
+    result = PixelFormat.MONO12P.unpack(packed, out)
+
+    assert result is out
+    np.testing.assert_array_equal(out, [[0x123, 0xABC], [0xFFF, 0x001]])
+
+
+def test_unpack_mono16() -> None:
+    pixels = np.array([0, 1, 0x1234, 0xFFFF], dtype="<u2")
+
+    np.testing.assert_array_equal(PixelFormat.MONO16.unpack(pixels.tobytes()), pixels)
+
+
+def test_unpack_mono12p_incomplete_group() -> None:
+    with pytest.raises(ValueError):
+        PixelFormat.MONO12P.unpack(bytes(4))
+
+
+def test_unpack_mono16_odd_length() -> None:
+    with pytest.raises(ValueError):
+        PixelFormat.MONO16.unpack(bytes(5))